@@ -0,0 +1,330 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple, List, Optional, Dict, Iterator, Any, IO
+import numpy as np
+from game import GoGame
+from heuristic import SimpleGoHeuristic
+from agent import MinimaxAgent
+
+#Batch analysis of SGF game records.
+#Files are parsed as a character stream and games are yielded one at a time (main line only, variations skipped),
+#each game is replayed with GoGame.play_move and every position is scored with SimpleGoHeuristic
+#(and optionally a short Minimax search). One JSON line is written per position as soon as its game is done.
+#Only a fixed window of games is in flight, so memory does not depend on archive size.
+
+READ_CHUNK = 64 * 1024
+GAMES_IN_FLIGHT_PER_WORKER = 4
+REPORT_EVERY_SECONDS = 5.0
+
+class SgfRecord:
+    def __init__(self, path: str, index: int, properties: List[Dict[str, List[str]]], truncated: bool = False,
+                 error: Optional[str] = None):
+        self.path = path
+        self.index = index
+        self.nodes = properties
+        self.truncated = truncated  # game tree still open at end of file
+        self.error = error          # file could not be read
+
+    def size(self) -> int:
+        values = self.nodes[0].get('SZ', ['19']) if self.nodes else ['19']
+        try:
+            return int(values[0].split(':')[0])
+        except ValueError:
+            return -1
+
+
+#SGF Parsing (streaming)
+
+def iter_chars(path: str) -> Iterator[str]:
+    with open(path, 'r', encoding = 'utf-8', errors = 'replace') as sgf_file:
+        for chunk in iter(lambda: sgf_file.read(READ_CHUNK), ''):
+            yield from chunk
+
+def iter_sgf_games(path: str) -> Iterator[SgfRecord]:
+    #Yield one record per game tree in the file, keeping only the main line (first variation at every fork).
+    #An unreadable file becomes a single error record instead of stopping the archive run
+    games = _iter_sgf_games(path)
+    game_index = 0
+    try:
+        for record in games:
+            game_index = record.index + 1
+            yield record
+    except OSError as error:
+        yield SgfRecord(path, game_index, [], error = f"cannot read file: {error}")
+
+def _iter_sgf_games(path: str) -> Iterator[SgfRecord]:
+    depth = 0
+    children = [0]          # variations already opened at each depth
+    skip_depth = None       # set while inside a side variation
+    nodes: List[Dict[str, List[str]]] = []
+    ident, pending_ident = '', ''
+    value: List[str] = []
+    in_value, escape = False, False
+    game_index = 0
+
+    for char in iter_chars(path):
+        if in_value:
+            if escape:
+                value.append(char)
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == ']':
+                in_value = False
+                if skip_depth is None and nodes and pending_ident:
+                    nodes[-1].setdefault(pending_ident, []).append(''.join(value))
+                value = []
+            else:
+                value.append(char)
+            continue
+
+        if char == '[':
+            #A bare "[..]" after a value is another value of the same property
+            if ident:
+                pending_ident, ident = ident, ''
+            in_value = True
+        elif char.isupper():
+            ident += char
+        elif char == ';':
+            ident = ''
+            if skip_depth is None and depth > 0:
+                nodes.append({})
+        elif char == '(':
+            ident = ''
+            depth += 1
+            if depth == 1:
+                nodes, children, skip_depth = [], [0, 0], None
+                continue
+            while len(children) <= depth:
+                children.append(0)
+            if skip_depth is None:
+                if children[depth - 1] > 0:
+                    skip_depth = depth
+                else:
+                    children[depth - 1] += 1
+            children[depth] = 0
+        elif char == ')':
+            ident = ''
+            if depth == 0:
+                continue
+            if skip_depth == depth:
+                skip_depth = None
+            depth -= 1
+            if depth == 0:
+                yield SgfRecord(path, game_index, nodes)
+                game_index += 1
+                nodes = []
+
+    if depth > 0:
+        yield SgfRecord(path, game_index, nodes, truncated = True)
+
+def iter_sgf_paths(paths: List[str]) -> Iterator[str]:
+    #Files are taken as-is, directories are walked lazily for *.sgf
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith('.sgf'):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+def iter_archive(paths: List[str]) -> Iterator[SgfRecord]:
+    for path in iter_sgf_paths(paths):
+        yield from iter_sgf_games(path)
+
+
+#Replay + Evaluation
+
+def sgf_point(value: str) -> Optional[Tuple[int, int]]:
+    #"cd" -> (row 3, collumn 2); "" and "tt" are passes
+    if value == '' or value == 'tt':
+        return None
+    if len(value) != 2:
+        raise ValueError(f"bad SGF point: {value!r}")
+    collumn, row = ord(value[0]) - ord('a'), ord(value[1]) - ord('a')
+    if not (0 <= row < GoGame.SIZE and 0 <= collumn < GoGame.SIZE):
+        raise ValueError(f"SGF point off the board: {value!r}")
+    return row, collumn
+
+def sgf_points(values: List[str]) -> List[Tuple[int, int]]:
+    #Setup properties may use compressed rectangles ("aa:cc")
+    points = []
+    for value in values:
+        if ':' in value:
+            first, second = sgf_point(value[:2]), sgf_point(value[3:])
+            if first is None or second is None:
+                raise ValueError(f"bad SGF rectangle: {value!r}")
+            for row in range(min(first[0], second[0]), max(first[0], second[0]) + 1):
+                for collumn in range(min(first[1], second[1]), max(first[1], second[1]) + 1):
+                    points.append((row, collumn))
+        else:
+            point = sgf_point(value)
+            if point is not None:
+                points.append(point)
+    return points
+
+def search_position(agent: MinimaxAgent, game: GoGame) -> Tuple[Optional[Tuple[int, int]], float]:
+    #MinimaxAgent.get_best_move always maximizes for WHITE; here the side to move picks its own best reply.
+    #Scores stay in the heuristic's WHITE point of view
+    moves = game.get_valid_moves()
+    if not moves or game.is_game_over:
+        return None, agent.heuristic.evaluate(game)
+
+    white_to_move = game.current_player == GoGame.WHITE
+    best_move, best_score = None, -np.inf if white_to_move else np.inf
+    for move in moves:
+        score = agent.minimax_algorithm(game.get_next_state(move), agent.depth_limit - 1, -np.inf, np.inf, not white_to_move)
+        if (white_to_move and score > best_score) or (not white_to_move and score < best_score):
+            best_move, best_score = move, score
+    return best_move, float(best_score)
+
+def position_row(record: SgfRecord, move_number: int, last_move, game: GoGame,
+                 heuristic: SimpleGoHeuristic, agent: Optional[MinimaxAgent]) -> Dict[str, Any]:
+    row = {
+        'file': record.path,
+        'game': record.index,
+        'move_number': move_number,
+        'last_move': list(last_move) if isinstance(last_move, tuple) else last_move,
+        'to_play': 'B' if game.current_player == GoGame.BLACK else 'W',
+        'captured_black': int(game.captured_black),
+        'captured_white': int(game.captured_white),
+        'evaluation': float(heuristic.evaluate(game)),
+    }
+    if agent is not None:
+        best_move, score = search_position(agent, game)
+        row['best_move'] = list(best_move) if best_move is not None else None
+        row['search_score'] = score
+    return row
+
+def analyse_record(record: SgfRecord, heuristic: SimpleGoHeuristic, agent: Optional[MinimaxAgent]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    #Replay one game and score every position (initial setup included). Returns rows + an error message, if any
+    rows: List[Dict[str, Any]] = []
+    if record.error is not None:
+        return rows, record.error
+    if record.size() != GoGame.SIZE:
+        return rows, f"unsupported board size {record.size()}"
+
+    game = GoGame()
+    try:
+        root = record.nodes[0] if record.nodes else {}
+        apply_setup(game, root)
+        if not root.get('PL') and root.get('AB') and not root.get('AW'):
+            game.current_player = GoGame.WHITE  # handicap: white moves first
+
+        rows.append(position_row(record, 0, None, game, heuristic, agent))
+        move_number = 0
+        for node_index, node in enumerate(record.nodes):
+            if node_index > 0:
+                apply_setup(game, node)
+            for color, player in (('B', GoGame.BLACK), ('W', GoGame.WHITE)):
+                if color not in node:
+                    continue
+                move = sgf_point(node[color][0])
+                if move is not None and game.grid[move] != GoGame.EMPTY:
+                    raise ValueError(f"move {move_number + 1} plays on an occupied point")
+                #Records do not always alternate (handicap, edits), so trust the colour in the file
+                game.current_player = player
+                game.play_move(move)
+                move_number += 1
+                rows.append(position_row(record, move_number, move if move is not None else 'pass', game, heuristic, agent))
+    except ValueError as error:
+        return rows, str(error)
+    if record.truncated:
+        return rows, 'truncated game record (unclosed at end of file)'
+    return rows, None
+
+def apply_setup(game: GoGame, node: Dict[str, List[str]]):
+    #Setup properties of a node (AE clears, AB/AW place stones, PL sets the side to move), applied before its move
+    for point in sgf_points(node.get('AE', [])):
+        game.grid[point] = GoGame.EMPTY
+    for point in sgf_points(node.get('AB', [])):
+        game.grid[point] = GoGame.BLACK
+    for point in sgf_points(node.get('AW', [])):
+        game.grid[point] = GoGame.WHITE
+    if node.get('PL'):
+        game.current_player = GoGame.WHITE if node['PL'][0].upper().startswith('W') else GoGame.BLACK
+
+
+#Worker Pool
+
+#Per-process state (set once by the initializer)
+_worker_heuristic: Optional[SimpleGoHeuristic] = None
+_worker_agent: Optional[MinimaxAgent] = None
+
+def _init_worker(depth_limit: int):
+    global _worker_heuristic, _worker_agent
+    _worker_heuristic = SimpleGoHeuristic()
+    _worker_agent = MinimaxAgent(heuristic = _worker_heuristic, depth_limit = depth_limit) if depth_limit > 0 else None
+
+def _analyse_in_worker(record: SgfRecord) -> Tuple[SgfRecord, List[Dict[str, Any]], Optional[str]]:
+    #A broken record becomes an error row instead of aborting the whole archive run
+    try:
+        rows, error = analyse_record(record, _worker_heuristic, _worker_agent)
+    except Exception as exception:
+        rows, error = [], f"{type(exception).__name__}: {exception}"
+    record.nodes = []  # no need to ship the moves back
+    return record, rows, error
+
+def iter_results(records: Iterator[SgfRecord], workers: int, depth_limit: int) -> Iterator[Tuple[SgfRecord, List[Dict[str, Any]], Optional[str]]]:
+    #Results come back in archive order. Only workers * GAMES_IN_FLIGHT_PER_WORKER games are pulled from the
+    #stream at a time (Pool.imap would drain the whole iterator up front)
+    if workers <= 0:
+        _init_worker(depth_limit)
+        for record in records:
+            yield _analyse_in_worker(record)
+        return
+
+    with ProcessPoolExecutor(max_workers = workers, initializer = _init_worker, initargs = (depth_limit,)) as pool:
+        in_flight = deque()
+        for record in records:
+            in_flight.append(pool.submit(_analyse_in_worker, record))
+            if len(in_flight) >= workers * GAMES_IN_FLIGHT_PER_WORKER:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+def run_pipeline(paths: List[str], output: IO[str], workers: int, depth_limit: int, log: IO[str] = sys.stderr) -> Dict[str, Any]:
+    stats = {'games': 0, 'positions': 0, 'errors': 0}
+    start = last_report = time.monotonic()
+
+    for record, rows, error in iter_results(iter_archive(paths), workers, depth_limit):
+        for row in rows:
+            output.write(json.dumps(row) + '\n')
+        if error is not None:
+            output.write(json.dumps({'file': record.path, 'game': record.index, 'error': error}) + '\n')
+            stats['errors'] += 1
+        output.flush()
+        stats['games'] += 1
+        stats['positions'] += len(rows)
+
+        now = time.monotonic()
+        if now - last_report >= REPORT_EVERY_SECONDS:
+            last_report = now
+            print(f"{stats['games']} games, {stats['positions']} positions ({stats['positions'] / (now - start):.1f} positions/s)", file = log)
+
+    stats['elapsed_s'] = time.monotonic() - start
+    stats['positions_per_s'] = stats['positions'] / stats['elapsed_s'] if stats['elapsed_s'] else 0.0
+    print(f"Done: {stats['games']} games, {stats['positions']} positions, {stats['errors']} errors "
+          f"in {stats['elapsed_s']:.1f}s ({stats['positions_per_s']:.1f} positions/s)", file = log)
+    return stats
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Analyse 9x9 SGF archives position by position (JSON lines output)')
+    parser.add_argument('paths', nargs = '+', help = 'SGF files or directories')
+    parser.add_argument('-o', '--output', default = '-', help = 'output .jsonl file (default: stdout)')
+    parser.add_argument('--workers', type = int, default = os.cpu_count() or 1, help = '0 runs everything in this process')
+    parser.add_argument('--depth', type = int, default = 0, help = 'Minimax depth per position (0 = heuristic only)')
+    args = parser.parse_args()
+
+    if args.output == '-':
+        run_pipeline(args.paths, sys.stdout, args.workers, args.depth)
+    else:
+        with open(args.output, 'w', encoding = 'utf-8') as output_file:
+            run_pipeline(args.paths, output_file, args.workers, args.depth)
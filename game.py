@@ -124,7 +124,30 @@ class GoGame:
 
         return new_game
 
-    
+    def play_move(self, move: Optional[Tuple[int, int]]):
+        #In-place version of get_next_state for fast replays (no copy, no "no legal moves" scan).
+        #The move is not validated; the caller is expected to check is_valid_move if needed.
+        #Two passes end the game, but a stone played afterwards (records may continue) reopens it
+        player = self.current_player
+        self.ko_point = None
+
+        if move is None:
+            self.consecutive_passes += 1
+        else:
+            row, collumn = move
+            self.grid[row, collumn] = player
+            context = {'captured_black': self.captured_black, 'captured_white': self.captured_white}
+            self.grid, self.ko_point, _ = self.calculate_captures(self.grid, move, player, context)
+            self.captured_black = context['captured_black']
+            self.captured_white = context['captured_white']
+            self.consecutive_passes = 0
+            self.is_game_over = False
+
+        self.current_player = self.WHITE if player == self.BLACK else self.BLACK
+        if self.consecutive_passes >= 2:
+            self.is_game_over = True
+
+
     def calculate_captures(self, grid: np.ndarray, move: Tuple[int, int], player: int, context: dict) -> Tuple[np.ndarray, Optional[Tuple[int, int]], int]:
         #Calculate captures, removes them from the grid, updates score context, and return ko info
         row, collumn = move
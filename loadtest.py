@@ -0,0 +1,153 @@
+import asyncio
+import argparse
+import json
+import random
+import time
+from typing import Dict, Any, Optional
+from server import GoServer, LatencyStats
+
+#Load-test client: simulates many concurrent games against a GoServer.
+#Each game is its own connection; BLACK plays random empty points (illegal ones are retried, then it passes).
+
+class JsonLineClient:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+
+    @classmethod
+    async def connect(cls, host: str, port: int) -> 'JsonLineClient':
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def call(self, **request) -> Dict[str, Any]:
+        #One request at a time per connection, so replies come back in order
+        self.next_id += 1
+        request['id'] = self.next_id
+        self.writer.write((json.dumps(request) + '\n').encode())
+        await self.writer.drain()
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError('server closed the connection')
+        return json.loads(line)
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+class InProcessClient:
+    #Same interface as JsonLineClient but talks to a GoServer directly (no sockets)
+    def __init__(self, server: GoServer, name: str):
+        self.server = server
+        self.name = name
+        self.next_id = 0
+
+    async def call(self, **request) -> Dict[str, Any]:
+        self.next_id += 1
+        request['id'] = self.next_id
+        return await self.server.handle_request(request, self.name)
+
+    async def close(self):
+        pass
+
+
+async def play_one_game(client, stats: Dict[str, Any], latency: LatencyStats, budget: float, max_turns: int, rng: random.Random):
+    reply = await client.call(op = 'new', ai = True, max_turns = max_turns)
+    game_id = reply['game']
+    state = reply
+
+    while not state['is_game_over']:
+        empty = [(r, c) for r, row in enumerate(state['grid']) for c, cell in enumerate(row) if cell == 0]
+        rng.shuffle(empty)
+        candidates = [list(point) for point in empty[:5]] + [None]
+
+        for move in candidates:
+            start = time.monotonic()
+            reply = await client.call(op = 'move', game = game_id, move = move, budget = budget)
+            latency.add(time.monotonic() - start)
+            stats['requests'] += 1
+
+            if reply['ok']:
+                state = reply
+                break
+            if reply['error'] == 'busy':
+                #Backpressure: back off, then pick a move again
+                stats['busy'] += 1
+                await asyncio.sleep(0.1 + rng.random() * 0.2)
+                break
+            if reply['error'] != 'illegal move':
+                stats['errors'] += 1
+                state['is_game_over'] = True
+                break
+
+    await client.call(op = 'close', game = game_id)
+    stats['games'] += 1
+
+
+async def run_load(client_factory, games: int, concurrency: int, budget: float, max_turns: int, seed: int) -> Dict[str, Any]:
+    stats = {'games': 0, 'requests': 0, 'busy': 0, 'errors': 0}
+    latency = LatencyStats(size = 100000)
+    rng = random.Random(seed)
+    limit = asyncio.Semaphore(concurrency)
+
+    async def worker(index: int):
+        async with limit:
+            client = await client_factory(index)
+            try:
+                await play_one_game(client, stats, latency, budget, max_turns, random.Random(rng.random()))
+            finally:
+                await client.close()
+
+    start = time.monotonic()
+    await asyncio.gather(*(worker(i) for i in range(games)))
+    elapsed = time.monotonic() - start
+
+    stats['elapsed_s'] = elapsed
+    stats['requests_per_s'] = stats['requests'] / elapsed if elapsed else 0.0
+    stats['move_latency'] = latency.summary()
+    return stats
+
+
+async def main(host: Optional[str], port: int, games: int, concurrency: int, budget: float, max_turns: int, seed: int,
+               workers: Optional[int], depth: int):
+    server = None
+    if host is None:
+        #No host given: spin up an in-process server so the test needs no sockets
+        server = GoServer(workers = workers, depth_limit = depth, default_budget = budget)
+        await server.start()
+        factory = lambda index: _in_process(server, index)
+    else:
+        factory = lambda index: JsonLineClient.connect(host, port)
+
+    try:
+        stats = await run_load(factory, games, concurrency, budget, max_turns, seed)
+        if server is not None:
+            stats['server'] = server.metrics()
+        else:
+            client = await JsonLineClient.connect(host, port)
+            stats['server'] = (await client.call(op = 'metrics'))['metrics']
+            await client.close()
+    finally:
+        if server is not None:
+            await server.stop()
+
+    print(json.dumps(stats, indent = 2))
+
+async def _in_process(server: GoServer, index: int) -> InProcessClient:
+    return InProcessClient(server, f"load-{index}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Simulate many concurrent games against the Go server')
+    parser.add_argument('--host', default = None, help = 'server host (omit to run an in-process server)')
+    parser.add_argument('--port', type = int, default = 8765)
+    parser.add_argument('--games', type = int, default = 200)
+    parser.add_argument('--concurrency', type = int, default = 200)
+    parser.add_argument('--budget', type = float, default = 0.5)
+    parser.add_argument('--max-turns', type = int, default = 20)
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--workers', type = int, default = None, help = 'in-process server only')
+    parser.add_argument('--depth', type = int, default = 2, help = 'in-process server only')
+    args = parser.parse_args()
+    asyncio.run(main(args.host, args.port, args.games, args.concurrency, args.budget, args.max_turns, args.seed,
+                     args.workers, args.depth))
@@ -0,0 +1,466 @@
+import asyncio
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple, Optional, Dict, Deque, Any
+import numpy as np
+from game import GoGame
+from heuristic import SimpleGoHeuristic
+from agent import MinimaxAgent
+
+#Headless multi-game service. Each line on the socket is one JSON request:
+#   {"id": 1, "op": "new", "ai": true, "max_turns": 100}
+#   {"id": 2, "op": "move", "game": "1", "move": [2, 3], "budget": 1.0}   (move = null -> pass)
+#   {"id": 3, "op": "state", "game": "1"}
+#   {"id": 4, "op": "close", "game": "1"}
+#   {"id": 5, "op": "metrics"}
+#Every reply echoes "id" and carries "ok"; failures carry "error" instead of a payload.
+#Human plays BLACK, the AI plays WHITE (same as GoUI, the heuristic scores from WHITE's POV).
+
+DEFAULT_DEPTH = 3
+DEFAULT_BUDGET = 2.0
+MAX_LINE_BYTES = 64 * 1024
+MAX_INFLIGHT_PER_CONNECTION = 32
+LATENCY_SAMPLES = 2048
+
+#Per-process state of the search pool (set once by the initializer)
+_worker_heuristic: Optional[SimpleGoHeuristic] = None
+
+def _init_worker():
+    global _worker_heuristic
+    _worker_heuristic = SimpleGoHeuristic()
+
+def _warm_up_worker(seconds: float):
+    #Sleeping keeps each warm-up busy long enough that the pool has to start a new process for the next one
+    time.sleep(seconds)
+
+class SearchDeadline(Exception):
+    pass
+
+class DeadlineMinimaxAgent(MinimaxAgent):
+    #MinimaxAgent that aborts (raises SearchDeadline) as soon as the deadline passes
+    def __init__(self, heuristic: SimpleGoHeuristic, depth_limit: int, deadline: float):
+        super().__init__(heuristic, depth_limit)
+        self.deadline = deadline
+
+    def get_best_move_before_deadline(self, game: GoGame, first_move: Tuple[int, int]) -> Tuple[Optional[Tuple[int, int]], bool]:
+        #Root loop of get_best_move, searching first_move (the previous pass's best) first.
+        #On deadline the best fully searched root move is kept; returns (move, finished)
+        moves = game.get_valid_moves()
+        moves.sort(key = lambda move: move != first_move)
+        best_score, best_move = -np.inf, None
+        try:
+            for move in moves:
+                score = self.minimax_algorithm(game.get_next_state(move), self.depth_limit - 1, -np.inf, np.inf, False)
+                if score > best_score:
+                    best_score, best_move = score, move
+        except SearchDeadline:
+            return best_move, False
+        return best_move, True
+
+    def minimax_algorithm(self, game: GoGame, depth: int, alpha: float, beta: float, maximizing_player: bool) -> float:
+        if time.monotonic() > self.deadline:
+            raise SearchDeadline()
+        return super().minimax_algorithm(game, depth, alpha, beta, maximizing_player)
+
+def _search_in_worker(context: dict, depth_limit: int, budget: float) -> Tuple[Optional[Tuple[int, int]], int, float]:
+    #Iterative deepening: depth 1 always runs to completion so there is a move to return. A deeper pass that hits
+    #the deadline still counts if it finished at least one root move: the previous best is searched first,
+    #so its partial result is never worse. budget is what is left after queueing (may be 0 -> depth 1 only)
+    start = time.monotonic()
+    heuristic = _worker_heuristic or SimpleGoHeuristic()
+    game = GoGame(**context)
+    best_move = MinimaxAgent(heuristic=heuristic, depth_limit=1).get_best_move(game)
+    depth_reached = 1
+
+    for depth in range(2, depth_limit + 1):
+        if best_move is None or time.monotonic() >= start + budget:
+            break
+        move, finished = DeadlineMinimaxAgent(heuristic, depth, start + budget).get_best_move_before_deadline(game, best_move)
+        if move is not None:
+            best_move, depth_reached = move, depth
+        if not finished:
+            break
+
+    return best_move, depth_reached, time.monotonic() - start
+
+
+class ServerBusy(Exception):
+    pass
+
+class ProtocolError(Exception):
+    pass
+
+
+class LatencyStats:
+    #Bounded window of recent samples so metrics never grow with uptime
+    def __init__(self, size: int = LATENCY_SAMPLES):
+        self.samples: Deque[float] = deque(maxlen = size)
+
+    def add(self, value: float):
+        self.samples.append(value)
+
+    def summary(self) -> Dict[str, float]:
+        if not self.samples:
+            return {'count': 0, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+        ordered = sorted(self.samples)
+        pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+        return {
+            'count': len(ordered),
+            'mean_ms': sum(ordered) / len(ordered) * 1000,
+            'p50_ms': pick(0.50),
+            'p95_ms': pick(0.95),
+            'max_ms': ordered[-1] * 1000,
+        }
+
+
+class SearchJob:
+    def __init__(self, context: dict, depth_limit: int, budget: float, future: asyncio.Future):
+        self.context = context
+        self.depth_limit = depth_limit
+        self.budget = budget
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class FairScheduler:
+    #Round-robin over clients so one connection with many games cannot starve the others.
+    #Total pending work is capped; past the cap new searches are rejected (backpressure)
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self.queues: Dict[str, Deque[SearchJob]] = {}
+        self.order: Deque[str] = deque()
+        self.pending = 0
+        self.condition = asyncio.Condition()
+
+    async def put(self, client: str, job: SearchJob):
+        async with self.condition:
+            if self.pending >= self.max_pending:
+                raise ServerBusy()
+            if client not in self.queues:
+                self.queues[client] = deque()
+                self.order.append(client)
+            self.queues[client].append(job)
+            self.pending += 1
+            self.condition.notify()
+
+    async def get(self) -> SearchJob:
+        async with self.condition:
+            while not self.order:
+                await self.condition.wait()
+            client = self.order.popleft()
+            queue = self.queues[client]
+            job = queue.popleft()
+            if queue:
+                self.order.append(client)
+            else:
+                del self.queues[client]
+            self.pending -= 1
+            return job
+
+
+class GameSession:
+    def __init__(self, session_id: str, owner: str, ai: bool, max_turns: int):
+        self.session_id = session_id
+        self.owner = owner
+        self.ai = ai
+        self.max_turns = max_turns
+        self.game = GoGame()
+        self.turn_counter = 1
+        self.lock = asyncio.Lock()
+
+    def advance(self, game: GoGame, turn_counter: int, move: Optional[Tuple[int, int]]) -> Tuple[GoGame, int]:
+        #Same transition + emergency stop as GoUI.run_game; the session itself is not touched
+        next_game = game.get_next_state(move)
+        turn_counter += 1
+        if turn_counter > self.max_turns:
+            next_game.is_game_over = True
+        return next_game, turn_counter
+
+    def snapshot(self) -> Dict[str, Any]:
+        score_black, score_white = self.game.calculate_score_for_evaluation()
+        return {
+            'game': self.session_id,
+            'grid': self.game.grid.tolist(),
+            'current_player': int(self.game.current_player),
+            'captured_black': int(self.game.captured_black),
+            'captured_white': int(self.game.captured_white),
+            'is_game_over': bool(self.game.is_game_over),
+            'turn': self.turn_counter,
+            'score': [float(score_black), float(score_white)],
+        }
+
+
+class GoServer:
+    def __init__(self, workers: Optional[int] = None, depth_limit: int = DEFAULT_DEPTH,
+                 default_budget: float = DEFAULT_BUDGET, max_pending: Optional[int] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.depth_limit = depth_limit
+        self.default_budget = default_budget
+        self.max_pending = max_pending or self.workers * 8
+        self.sessions: Dict[str, GameSession] = {}
+        self.session_ids = itertools.count(1)
+        self.client_ids = itertools.count(1)
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.scheduler: Optional[FairScheduler] = None
+        self.dispatchers = []
+        self.started_at = time.monotonic()
+        self.counters = {'moves': 0, 'searches': 0, 'search_timeouts': 0, 'rejected_busy': 0, 'errors': 0}
+        self.queue_latency = LatencyStats()
+        self.search_latency = LatencyStats()
+
+    #Lifecycle
+
+    async def start(self):
+        #Workers come from a forkserver (not forked from this process) and are all started before any socket exists,
+        #otherwise they inherit the listening/client sockets and closing a connection here never sends FIN
+        self.pool = ProcessPoolExecutor(max_workers = self.workers, initializer = _init_worker,
+                                        mp_context = multiprocessing.get_context('forkserver'))
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, _warm_up_worker, 0.05) for _ in range(self.workers)))
+        self.scheduler = FairScheduler(self.max_pending)
+        self.started_at = time.monotonic()
+        #One dispatcher per worker: a job only leaves the fair queue when a process is free for it
+        self.dispatchers = [asyncio.create_task(self._dispatch_loop()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self.dispatchers:
+            task.cancel()
+        await asyncio.gather(*self.dispatchers, return_exceptions = True)
+        self.dispatchers = []
+        if self.pool:
+            #Running searches finish on their own (bounded by their budget); don't block the loop meanwhile
+            pool, self.pool = self.pool, None
+            await asyncio.get_running_loop().run_in_executor(None, lambda: pool.shutdown(wait = True, cancel_futures = True))
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8765) -> asyncio.AbstractServer:
+        if self.pool is None:
+            await self.start()
+        return await asyncio.start_server(self.handle_connection, host, port, limit = MAX_LINE_BYTES)
+
+    #Search pool
+
+    async def _dispatch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.scheduler.get()
+            #Searches whose caller already gave up (timeout / disconnect) are dropped, not run
+            if job.future.done():
+                continue
+            waited = time.monotonic() - job.enqueued_at
+            self.queue_latency.add(waited)
+            #Time spent queued counts against the budget; an exhausted budget still gets a depth-1 answer
+            remaining = max(job.budget - waited, 0.0)
+            try:
+                result = await loop.run_in_executor(self.pool, _search_in_worker, job.context, job.depth_limit, remaining)
+            except Exception as error:
+                if not job.future.done():
+                    job.future.set_exception(error)
+                continue
+            if not job.future.done():
+                job.future.set_result(result)
+
+    async def search(self, client: str, game: GoGame, budget: float) -> Tuple[Optional[Tuple[int, int]], int, float]:
+        future = asyncio.get_running_loop().create_future()
+        await self.scheduler.put(client, SearchJob(vars(game), self.depth_limit, budget, future))
+        #The worker honours the budget itself; this is only a safety net for a stalled pool.
+        #On timeout wait_for cancels the future, so a job still queued is skipped by the dispatcher
+        try:
+            return await asyncio.wait_for(future, timeout = budget * 4 + 5.0 + self.scheduler.pending)
+        except asyncio.TimeoutError:
+            self.counters['search_timeouts'] += 1
+            raise
+
+    #Protocol
+
+    async def handle_request(self, request: Dict[str, Any], client: str = 'local') -> Dict[str, Any]:
+        #Entry point for both sockets and in-process callers
+        reply: Dict[str, Any] = {'id': request.get('id'), 'ok': True}
+        try:
+            reply.update(await self._dispatch_op(request, client))
+        except ServerBusy:
+            self.counters['rejected_busy'] += 1
+            reply.update(ok = False, error = 'busy')
+        except asyncio.TimeoutError:
+            reply.update(ok = False, error = 'search timeout')
+        except ProtocolError as error:
+            self.counters['errors'] += 1
+            reply.update(ok = False, error = str(error))
+        except Exception as error:
+            self.counters['errors'] += 1
+            reply.update(ok = False, error = f"internal error: {type(error).__name__}")
+        return reply
+
+    async def _dispatch_op(self, request: Dict[str, Any], client: str) -> Dict[str, Any]:
+        op = request.get('op')
+        if op == 'new':
+            max_turns = request.get('max_turns', 100)
+            if type(max_turns) is not int or max_turns <= 0:
+                raise ProtocolError('max_turns must be a positive integer')
+            session = GameSession(str(next(self.session_ids)), client, bool(request.get('ai', True)), max_turns)
+            self.sessions[session.session_id] = session
+            return session.snapshot()
+        if op == 'metrics':
+            return {'metrics': self.metrics()}
+        if op not in ('state', 'close', 'move'):
+            raise ProtocolError(f"unknown op: {op!r}")
+
+        session = self._get_session(request, client)
+        if op == 'state':
+            return session.snapshot()
+        if op == 'close':
+            del self.sessions[session.session_id]
+            return {'game': session.session_id}
+        return await self._play_move(session, request, client)
+
+    def _get_session(self, request: Dict[str, Any], client: str) -> GameSession:
+        session = self.sessions.get(str(request.get('game')))
+        if session is None or session.owner != client:
+            raise ProtocolError('unknown game')
+        return session
+
+    async def _play_move(self, session: GameSession, request: Dict[str, Any], client: str) -> Dict[str, Any]:
+        move = request.get('move')
+        if move is not None:
+            if not (isinstance(move, list) and len(move) == 2 and all(type(v) is int for v in move)):
+                raise ProtocolError('move must be [row, column] or null')
+            move = (move[0], move[1])
+        budget = request.get('budget', self.default_budget)
+        if type(budget) not in (int, float) or not math.isfinite(budget) or budget <= 0:
+            raise ProtocolError('budget must be a positive number of seconds')
+
+        async with session.lock:
+            game = session.game
+            if game.is_game_over:
+                raise ProtocolError('game is over')
+            if session.ai and game.current_player != GoGame.BLACK:
+                raise ProtocolError('not your turn')
+            if move is not None and not game.is_valid_move(*move):
+                raise ProtocolError('illegal move')
+            #Build the new position locally and publish it only once the whole exchange succeeded,
+            #so concurrent "state" requests never see a human move that might still be dropped
+            next_game, next_turn = session.advance(game, session.turn_counter, move)
+            moves_played = 1
+
+            reply: Dict[str, Any] = {}
+            if session.ai and not next_game.is_game_over and next_game.current_player == GoGame.WHITE:
+                ai_move, depth, elapsed = await self.search(client, next_game, budget)
+                next_game, next_turn = session.advance(next_game, next_turn, ai_move)
+                moves_played += 1
+                self.counters['searches'] += 1
+                self.search_latency.add(elapsed)
+                reply['ai_move'] = list(ai_move) if ai_move is not None else None
+                reply['ai_depth'] = depth
+
+            session.game, session.turn_counter = next_game, next_turn
+            self.counters['moves'] += moves_played
+            reply.update(session.snapshot())
+            return reply
+
+    def metrics(self) -> Dict[str, Any]:
+        uptime = max(time.monotonic() - self.started_at, 1e-9)
+        return {
+            'uptime_s': uptime,
+            'sessions': len(self.sessions),
+            'workers': self.workers,
+            'pending_searches': self.scheduler.pending if self.scheduler else 0,
+            'moves_per_s': self.counters['moves'] / uptime,
+            'searches_per_s': self.counters['searches'] / uptime,
+            'queue_latency': self.queue_latency.summary(),
+            'search_latency': self.search_latency.summary(),
+            **self.counters,
+        }
+
+    #Connections
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        client = f"conn-{next(self.client_ids)}"
+        write_lock = asyncio.Lock()
+        #Bounded pipelining: once this many requests are in flight we stop reading, so TCP pushes back on the client
+        inflight = asyncio.Semaphore(MAX_INFLIGHT_PER_CONNECTION)
+        tasks = set()
+        peer_done_writing = False
+
+        async def respond(request: Dict[str, Any]):
+            try:
+                reply = await self.handle_request(request, client)
+                async with write_lock:
+                    writer.write((json.dumps(reply) + '\n').encode())
+                    await writer.drain()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+            finally:
+                inflight.release()
+
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    break
+                if not line:
+                    peer_done_writing = True
+                    break
+                await inflight.acquire()
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError
+                except ValueError:
+                    inflight.release()
+                    self.counters['errors'] += 1
+                    async with write_lock:
+                        writer.write(b'{"id": null, "ok": false, "error": "invalid json"}\n')
+                        await writer.drain()
+                    continue
+                task = asyncio.create_task(respond(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except ConnectionError:
+            pass
+        finally:
+            #EOF only means the client is done sending (it may have half-closed): still answer what it pipelined
+            if peer_done_writing:
+                await asyncio.gather(*tasks, return_exceptions = True)
+            else:
+                for task in list(tasks):
+                    task.cancel()
+            #Sessions live as long as the connection that created them
+            for session_id in [sid for sid, s in self.sessions.items() if s.owner == client]:
+                del self.sessions[session_id]
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+async def run_server(host: str, port: int, workers: Optional[int], depth_limit: int, budget: float, max_pending: Optional[int]):
+    server = GoServer(workers = workers, depth_limit = depth_limit, default_budget = budget, max_pending = max_pending)
+    listener = await server.serve(host, port)
+    print(f"Go server on {host}:{port} (workers={server.workers}, depth={depth_limit}, max pending={server.max_pending})")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await server.stop()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Headless multi-game Go server (line-delimited JSON)')
+    parser.add_argument('--host', default = '127.0.0.1')
+    parser.add_argument('--port', type = int, default = 8765)
+    parser.add_argument('--workers', type = int, default = None)
+    parser.add_argument('--depth', type = int, default = DEFAULT_DEPTH)
+    parser.add_argument('--budget', type = float, default = DEFAULT_BUDGET)
+    parser.add_argument('--max-pending', type = int, default = None)
+    args = parser.parse_args()
+    try:
+        asyncio.run(run_server(args.host, args.port, args.workers, args.depth, args.budget, args.max_pending))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,32 @@
+import asyncio
+import json
+import unittest
+from server import GoServer
+
+class HalfCloseTest(unittest.IsolatedAsyncioTestCase):
+    #A client that pipelines requests and then half-closes must get every reply followed by EOF
+    async def asyncSetUp(self):
+        self.server = GoServer(workers = 2, depth_limit = 2, default_budget = 0.2)
+        self.listener = await self.server.serve('127.0.0.1', 0)
+        self.port = self.listener.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.listener.close()
+        await self.listener.wait_closed()
+        await self.server.stop()
+
+    async def test_new_move_half_close_gets_replies_then_eof(self):
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+        writer.write(b'{"id": 1, "op": "new"}\n{"id": 2, "op": "move", "game": "1", "move": [4, 4]}\n')
+        writer.write_eof()
+
+        data = await asyncio.wait_for(reader.read(), timeout = 10)
+        replies = [json.loads(line) for line in data.decode().splitlines()]
+        writer.close()
+
+        self.assertEqual([reply['id'] for reply in replies], [1, 2])
+        self.assertTrue(all(reply['ok'] for reply in replies))
+        self.assertEqual(replies[1]['turn'], 3)
+
+if __name__ == '__main__':
+    unittest.main()